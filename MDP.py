@@ -1,9 +1,21 @@
-import random
+from dataclasses import dataclass
+
+import numpy as np
 
 # ----- MDP definition -----
-states = ["A", "B", "C"]
+states = ["A", "B", "C", "D", "E"]
 actions = ["Left", "Right"]
 
+# States/actions are also encoded by their index in `states` / `actions`.
+S2I = {s: i for i, s in enumerate(states)}
+A2I = {a: i for i, a in enumerate(actions)}
+TERMINAL = S2I["E"]
+
+# Reward depends only on the state arrived in: R[s_next] (1 for E, else 0)
+R = np.zeros(len(states), dtype=np.int8)
+R[TERMINAL] = 1
+_R_LIST = R.tolist()  # plain ints for the scalar path
+
 def transition(s, a):
     """Deterministic transition function: returns next_state."""
     if s == "A":
@@ -19,23 +31,45 @@ def transition(s, a):
     raise ValueError("Unknown state")
 
 def reward(s, a, s_next):
-    """Reward for arriving in E."""
-    return 1 if s_next == "E" else 0
+    """Reward for arriving in E (table lookup)."""
+    return _R_LIST[S2I[s_next]]
+
+# ----- Same chain as lookup tables (for batched rollouts) -----
+# T_idx[s, a] -> s_next, R_idx[s, a] -> reward for that move
+T_idx = np.array([[0, 1], [0, 2], [1, 3], [2, 4], [3, 4]], dtype=np.int8)
+R_idx = R[T_idx]
 
 # ----- A simple rollout (simulate an agent) -----
+@dataclass
+class Trajectory:
+    """Episode as parallel arrays of state/action indices; row 0 is the start (action -1)."""
+    states: np.ndarray
+    actions: np.ndarray
+    rewards: np.ndarray
+
+    def rows(self):
+        """Yield (state, action_taken_to_get_here, reward) with names decoded."""
+        for s, a, r in zip(self.states, self.actions, self.rewards):
+            yield states[s], (actions[a] if a >= 0 else None), int(r)
+
 def run_episode(start="A", steps=10, policy=None, seed=0):
-    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    random_actions = rng.integers(0, len(actions), size=steps).tolist() if policy is None else None
     s = start
     total = 0
-    trajectory = [(s, None, 0)]
+    traj_states = np.empty(steps + 1, dtype=np.int8)
+    traj_actions = np.empty(steps + 1, dtype=np.int8)
+    traj_rewards = np.empty(steps + 1, dtype=np.int8)
+    traj_states[0], traj_actions[0], traj_rewards[0] = S2I[s], -1, 0
+    n = 1
 
     for t in range(steps):
         if s == "E":
-            break  # episode ends when we reach C
+            break  # episode ends when we reach E
         
         # policy: a function that chooses an action given state
         if policy is None:
-            a = random.choice(actions)  # random behavior
+            a = actions[random_actions[t]]  # random behavior
         else:
             a = policy(s)
 
@@ -43,10 +77,53 @@ def run_episode(start="A", steps=10, policy=None, seed=0):
         r = reward(s, a, s_next)
 
         total += r
-        trajectory.append((s_next, a, r))
+        traj_states[n], traj_actions[n], traj_rewards[n] = S2I[s_next], A2I[a], r
+        n += 1
         s = s_next
 
-    return total, trajectory
+    return total, Trajectory(traj_states[:n], traj_actions[:n], traj_rewards[:n])
+
+def run_episodes(n=1000, start="A", steps=10, seed=0):
+    """
+    Roll out n random-policy episodes in parallel (same dynamics as run_episode).
+    Only the time loop runs in Python; all n episodes advance with one gather per step.
+    Returns an int array with the total reward of each episode.
+    """
+    rng = np.random.default_rng(seed)
+    s = np.full(n, S2I[start], dtype=np.int8)
+    total = np.zeros(n, dtype=np.int64)
+    actions_t = rng.integers(0, len(actions), size=(steps, n), dtype=np.int8)
+
+    for t in range(steps):
+        a = actions_t[t]
+        active = s != TERMINAL  # finished episodes stay put and earn nothing
+        total += R_idx[s, a] * active
+        s = np.where(active, T_idx[s, a], s)
+
+    return total
+
+# ----- Exact solution: value iteration on the tables -----
+def value_iteration(gamma=0.9, tol=1e-9, max_iter=1000):
+    """
+    Compute V* with Bellman optimality backups, updating V in place (Gauss-Seidel).
+    E is terminal, so V(E) = 0 and it has no action.
+    Returns (V, policy): V indexed like `states`, policy mapping state -> action.
+    """
+    V = np.zeros(len(states))
+    for _ in range(max_iter):
+        delta = 0.0
+        for s in range(len(states)):
+            if s == TERMINAL:
+                continue
+            v = (R_idx[s] + gamma * V[T_idx[s]]).max()
+            delta = max(delta, abs(v - V[s]))
+            V[s] = v
+        if delta < tol:
+            break
+
+    Q = R_idx + gamma * V[T_idx]
+    policy = {states[s]: actions[int(Q[s].argmax())] for s in range(len(states)) if s != TERMINAL}
+    return V, policy
 
 # Example: a greedy policy that always moves right
 def always_right_policy(s):
@@ -56,5 +133,13 @@ if __name__ == "__main__":
     total, traj = run_episode(start="A", steps=10, policy=always_right_policy)
     print("Total reward:", total)
     print("Trajectory (state, action_taken_to_get_here, reward):")
-    for item in traj:
-        print(item)
\ No newline at end of file
+    for item in traj.rows():
+        print(item)
+
+    V, policy = value_iteration(gamma=0.9)
+    print("\nValue iteration (gamma=0.9):")
+    for name, v in zip(states, V):
+        print(f"  V({name}) = {v:.4f}  action: {policy.get(name)}")
+
+    totals = run_episodes(n=10000, start="A", steps=10)
+    print("\nRandom policy, mean reward over", len(totals), "episodes:", totals.mean())
\ No newline at end of file
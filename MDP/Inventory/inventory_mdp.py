@@ -1,4 +1,23 @@
-import random
+import importlib.util
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+_spec = importlib.util.spec_from_file_location(
+    "exact_solver", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exact_solver.py"))
+exact_solver = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(exact_solver)
+policy_eval, policy_iteration = exact_solver.policy_eval, exact_solver.policy_iteration
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional: fall back to plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
 
 # ----- MDP definition (toy inventory control) -----
 # State = (inventory_level, demand_regime)
@@ -8,6 +27,24 @@ import random
 MAX_INV = 6
 states = [(i, r) for i in range(MAX_INV + 1) for r in ["Low", "High"]]
 
+# Internally a state is one small int: (inv << 1) | regime_bit (Low = 0, High = 1),
+# which is also its index in `states`.
+REGIME_BIT = {"Low": 0, "High": 1}
+STATE_ID = {s: i for i, s in enumerate(states)}
+DECODE = states
+
+
+def encode(s):
+    """(inv, regime) -> packed state id."""
+    inv, regime = s
+    return (inv << 1) | REGIME_BIT[regime]
+
+
+def decode(sid):
+    """Packed state id -> (inv, regime)."""
+    return DECODE[sid]
+
+
 # Action = order quantity (arrives immediately, for simplicity)
 actions = [0, 1, 2, 3]  # units to order
 
@@ -17,50 +54,54 @@ ORDER_COST = 2          # cost per unit ordered
 HOLDING_COST = 1        # cost per unit of leftover inventory
 STOCKOUT_PENALTY = 4    # penalty per unit of unmet demand
 
+REGIME_STAY_PROB = 0.75  # demand regime persists with this probability
 
-def sample_next_regime(regime):
-    """Demand regime follows a simple 2-state Markov chain."""
-    u = random.random()
-    if regime == "Low":
-        return "Low" if u < 0.75 else "High"
-    else:  # High
-        return "High" if u < 0.75 else "Low"
 
+# Demand values per regime, sampled uniformly (repeats act as weights)
+LOW_D = np.array([0, 1, 1, 2])      # mostly 0-2
+HIGH_D = np.array([1, 2, 3, 3, 4])  # mostly 2-4
+DEMAND_VALUES = {"Low": tuple(LOW_D.tolist()), "High": tuple(HIGH_D.tolist())}
 
-def sample_demand(regime):
-    """Stochastic demand conditional on regime (small integers)."""
-    if regime == "Low":
-        return random.choice([0, 1, 1, 2])   # mostly 0-2
-    else:
-        return random.choice([1, 2, 3, 3, 4])  # mostly 2-4
+DEMAND_BY_BIT = (DEMAND_VALUES["Low"], DEMAND_VALUES["High"])
 
 
-def transition(s, a):
+def transition_int(sid, a, u_demand, u_regime):
     """
-    Stochastic transition: returns next_state plus extra info:
-    - demand sampled from current regime
-    - next demand regime sampled from Markov chain
+    Stochastic transition on packed ids: returns (next_id, demand, sales, unmet, inv_after_order).
+    - demand sampled from current regime (uniform u_demand in [0, 1))
+    - regime stays with prob REGIME_STAY_PROB (uniform u_regime)
     Inventory evolves as:
       inv_after_order = min(MAX_INV, inv + order)
       inv_next = max(0, inv_after_order - demand)
     """
-    inv, regime = s
-    order_qty = a
+    inv, regime_bit = sid >> 1, sid & 1
 
-    inv_after_order = min(MAX_INV, inv + order_qty)
-    demand = sample_demand(regime)
+    inv_after_order = min(MAX_INV, inv + a)
+    values = DEMAND_BY_BIT[regime_bit]
+    demand = values[int(u_demand * len(values))]
     sales = min(inv_after_order, demand)
     unmet = max(0, demand - inv_after_order)
 
     inv_next = inv_after_order - sales
-    regime_next = sample_next_regime(regime)
+    if u_regime >= REGIME_STAY_PROB:
+        regime_bit ^= 1
 
-    s_next = (inv_next, regime_next)
-    info = {"demand": demand, "sales": sales, "unmet": unmet, "inv_after_order": inv_after_order}
-    return s_next, info
+    return (inv_next << 1) | regime_bit, demand, sales, unmet, inv_after_order
 
 
-def reward(s, a, s_next, info):
+def transition(s, a, u_demand, u_regime):
+    """Same as transition_int for (inv, regime) tuples: returns (next_state, demand, sales, unmet, inv_after_order)."""
+    sid_next, demand, sales, unmet, inv_after_order = transition_int(encode(s), a, u_demand, u_regime)
+    return decode(sid_next), demand, sales, unmet, inv_after_order
+
+
+def reward_int(a, sid_next, sales, unmet):
+    """Reward (see `reward`) with the next state given as a packed id."""
+    return (PRICE_PER_UNIT * sales - ORDER_COST * a
+            - HOLDING_COST * (sid_next >> 1) - STOCKOUT_PENALTY * unmet)
+
+
+def reward(s, a, s_next, sales, unmet):
     """
     Reward = profit (revenue - costs), using a simple one-step accounting:
     - revenue from sales
@@ -69,8 +110,6 @@ def reward(s, a, s_next, info):
     - stockout penalty for unmet demand
     """
     order_qty = a
-    sales = info["sales"]
-    unmet = info["unmet"]
     inv_next, _ = s_next
 
     revenue = PRICE_PER_UNIT * sales
@@ -81,32 +120,122 @@ def reward(s, a, s_next, info):
     return revenue - ordering_cost - holding_cost - stockout_cost
 
 
+# ----- Compiled rollout (scalar ints, no tuples/dicts) -----
+# Regime is encoded as 0 = "Low", 1 = "High"; demand is drawn from LOW_D / HIGH_D.
+N_ACTIONS = len(actions)
+
+POLICY_SIMPLE_REORDER = 1
+
+
+@njit(cache=True)
+def rollout(start_inv, start_regime, steps, policy_id, seed):
+    """
+    Same dynamics and reward as run_episode, compiled with numba when available.
+    policy_id POLICY_SIMPLE_REORDER follows simple_reorder_policy; any other value
+    orders uniformly at random. Returns only the total reward; use run_episode for
+    the trajectory.
+    Seeds np.random with `seed`: compiled, that is numba's own RNG, but without
+    numba it reseeds NumPy's global RNG, which callers sharing it will notice.
+    """
+    np.random.seed(seed)
+    inv = start_inv
+    regime = start_regime
+    total = 0
+
+    for _ in range(steps):
+        if policy_id == POLICY_SIMPLE_REORDER:
+            if inv <= 1:
+                a = 3
+            elif inv == 2:
+                a = 2
+            elif inv == 3:
+                a = 1
+            else:
+                a = 0
+        else:
+            a = np.random.randint(0, N_ACTIONS)
+
+        inv_after_order = min(MAX_INV, inv + a)
+        if regime == 0:
+            demand = LOW_D[np.random.randint(0, len(LOW_D))]
+        else:
+            demand = HIGH_D[np.random.randint(0, len(HIGH_D))]
+        sales = min(inv_after_order, demand)
+        unmet = max(0, demand - inv_after_order)
+        inv = inv_after_order - sales
+
+        if np.random.random() >= REGIME_STAY_PROB:
+            regime = 1 - regime
+
+        total += (PRICE_PER_UNIT * sales - ORDER_COST * a
+                  - HOLDING_COST * inv - STOCKOUT_PENALTY * unmet)
+
+    return total
+
+
 # ----- A simple rollout (simulate an agent) -----
+INFO_FIELDS = ("demand", "sales", "unmet", "inv_after_order")
+
+
+@dataclass
+class Trajectory:
+    """
+    Episode stored as parallel arrays (structure of arrays).
+    Row 0 is the start state (action -1, reward 0, info unused);
+    states are packed ids (indices into `states`), info maps each INFO_FIELDS name to its array.
+    """
+    states: np.ndarray
+    actions: np.ndarray
+    rewards: np.ndarray
+    info: dict
+
+    def rows(self):
+        """Yield (state, action_taken_to_get_here, reward, info) tuples for printing."""
+        for t in range(len(self.states)):
+            if t == 0:
+                yield states[self.states[0]], None, 0, {"note": "start"}
+            else:
+                info = {k: int(v[t]) for k, v in self.info.items()}
+                yield states[self.states[t]], int(self.actions[t]), int(self.rewards[t]), info
+
+
 def run_episode(start=(3, "Low"), steps=10, policy=None, seed=0):
-    random.seed(seed)
-    s = start
+    rng = np.random.default_rng(seed)
+    # One call for the whole episode: per step (random action, demand, regime) uniforms
+    u = rng.random((steps, 3)).tolist()
+    s = encode(start)
     total = 0
-    trajectory = [(s, None, 0, {"note": "start"})]
+    traj_states = np.empty(steps + 1, dtype=np.uint8)
+    traj_actions = np.empty(steps + 1, dtype=np.int16)
+    traj_rewards = np.empty(steps + 1, dtype=np.int32)
+    info = {k: np.empty(steps + 1, dtype=np.int16) for k in INFO_FIELDS}
+    demand_buf, sales_buf = info["demand"], info["sales"]
+    unmet_buf, after_order_buf = info["unmet"], info["inv_after_order"]
+    traj_states[0], traj_actions[0], traj_rewards[0] = s, -1, 0
 
-    for t in range(steps):
-        # policy: a function that chooses an action given state
+    for t in range(1, steps + 1):
+        # policy: a function that chooses an action given the (inv, regime) state
+        u_action, u_demand, u_regime = u[t - 1]
         if policy is None:
-            a = random.choice(actions)  # random behavior
+            a = actions[int(u_action * len(actions))]  # random behavior
         else:
-            a = policy(s)
+            a = policy(DECODE[s])
 
-        s_next, info = transition(s, a)
-        r = reward(s, a, s_next, info)
+        s_next, demand, sales, unmet, inv_after_order = transition_int(s, a, u_demand, u_regime)
+        r = reward_int(a, s_next, sales, unmet)
 
         total += r
-        trajectory.append((s_next, a, r, info))
+        traj_states[t], traj_actions[t], traj_rewards[t] = s_next, a, r
+        demand_buf[t], sales_buf[t] = demand, sales
+        unmet_buf[t], after_order_buf[t] = unmet, inv_after_order
         s = s_next
 
-    return total, trajectory
+    return total, Trajectory(traj_states, traj_actions, traj_rewards, info)
 
 
 # Example policy: simple (s,S)-like heuristic
 # - If inventory is low, order more; if high, order less.
+@lru_cache(maxsize=None)
 def simple_reorder_policy(s):
     inv, regime = s
     if inv <= 1:
@@ -118,9 +247,51 @@ def simple_reorder_policy(s):
     return 0
 
 
+# ----- Exact evaluation (no sampling) -----
+def build_tensors():
+    """
+    Exact model as arrays: T[s, a, s'] = P(s' | s, a) and R[s, a] = E[reward | s, a].
+    Enumerates every demand value and regime switch instead of sampling them.
+    """
+    T = np.zeros((len(states), len(actions), len(states)))
+    R = np.zeros((len(states), len(actions)))
+    for s, sid in STATE_ID.items():
+        inv, regime = s
+        values = DEMAND_VALUES[regime]
+        other = "High" if regime == "Low" else "Low"
+        regime_dist = [(regime, REGIME_STAY_PROB), (other, 1.0 - REGIME_STAY_PROB)]
+        for a in actions:
+            inv_after_order = min(MAX_INV, inv + a)
+            for demand in values:  # listed values are equally likely
+                p_d = 1.0 / len(values)
+                sales = min(inv_after_order, demand)
+                unmet = max(0, demand - inv_after_order)
+                inv_next = inv_after_order - sales
+                R[sid, a] += p_d * reward(s, a, (inv_next, regime), sales, unmet)
+                for regime_next, p_r in regime_dist:
+                    T[sid, a, STATE_ID[(inv_next, regime_next)]] += p_d * p_r
+    return T, R
+
+
+def policy_array(policy):
+    """Tabulate a policy function as an array of action indices, one per state id."""
+    return np.array([actions.index(policy(s)) for s in states])
+
+
 if __name__ == "__main__":
     total, traj = run_episode(start=(3, "Low"), steps=12, policy=simple_reorder_policy, seed=1)
     print("Total reward:", total)
     print("Trajectory (state, action_taken_to_get_here, reward, info):")
-    for item in traj:
+    for item in traj.rows():
         print(item)
+
+    totals = [rollout(3, 0, 12, POLICY_SIMPLE_REORDER, seed) for seed in range(1000)]
+    print("Compiled rollout, mean total reward over 1000 seeds:", sum(totals) / len(totals))
+
+    T, R = build_tensors()
+    V_heur = policy_eval(policy_array(simple_reorder_policy), T, R)
+    V_opt, pi_opt = policy_iteration(T, R)
+    print("\nExact discounted values (gamma=0.95), heuristic vs optimal:")
+    for s in states:
+        sid = STATE_ID[s]
+        print(f"  {s}: {V_heur[sid]:8.3f}  {V_opt[sid]:8.3f}  (optimal order: {actions[pi_opt[sid]]})")
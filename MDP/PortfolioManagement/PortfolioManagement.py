@@ -1,4 +1,16 @@
-import random
+import importlib.util
+import os
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+_spec = importlib.util.spec_from_file_location(
+    "exact_solver", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exact_solver.py"))
+exact_solver = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(exact_solver)
+policy_eval, policy_iteration = exact_solver.policy_eval, exact_solver.policy_iteration
 
 # ----- MDP definition (toy portfolio) -----
 # State = (wealth_level, market_regime)
@@ -9,113 +21,173 @@ states = [(w, m) for w in ["Low", "Mid", "High"] for m in ["Bear", "Bull"]]
 # Action = target allocation to risky asset
 actions = ["RiskOff", "Balanced", "RiskOn"]  # ~ 0%, 50%, 100% risky
 
-def transition(s, a):
-    """
-    Stochastic transition: returns next_state.
-    - market regime follows a Markov chain
-    - wealth changes depending on regime + action
-    """
-    wealth, market = s
+# Internally a state is an int: wealth_level * 2 + market_bit (Bear = 0, Bull = 1),
+# i.e. its index in `states`; actions are indices into `actions`.
+STATE_ID = {s: i for i, s in enumerate(states)}
+ACTION_ID = {a: i for i, a in enumerate(actions)}
+DECODE = states
 
-    # 1) Market regime transition (Markov)
-    u = random.random()
-    if market == "Bear":
-        market_next = "Bear" if u < 0.7 else "Bull"
-    else:  # Bull
-        market_next = "Bull" if u < 0.7 else "Bear"
+def encode(s):
+    """(wealth, market) -> state id."""
+    return STATE_ID[s]
 
-    # 2) Wealth transition depends on action + current market (simple rules)
-    # Think of this as "expected" wealth drift (no numbers, just buckets).
+def decode(sid):
+    """State id -> (wealth, market)."""
+    return DECODE[sid]
+
+def market_distribution(market):
+    """Market regime follows a Markov chain: stays with prob 0.7."""
+    other = "Bull" if market == "Bear" else "Bear"
+    return [(market, 0.7), (other, 0.3)]
+
+def wealth_distribution(wealth, market, a):
+    """
+    Next wealth level as [(wealth_next, prob), ...]; depends on action + current market.
+    Think of this as "expected" wealth drift (no numbers, just buckets).
+    """
     if a == "RiskOff":
         # steady/safe: tends to stay or drift up slowly
         if wealth == "Low":
-            wealth_next = "Mid" if random.random() < 0.4 else "Low"
-        elif wealth == "Mid":
-            wealth_next = "High" if random.random() < 0.2 else "Mid"
-        else:  # High
-            wealth_next = "High"
-    elif a == "Balanced":
+            return [("Mid", 0.4), ("Low", 0.6)]
+        if wealth == "Mid":
+            return [("High", 0.2), ("Mid", 0.8)]
+        return [("High", 1.0)]
+    if a == "Balanced":
         if market == "Bull":
             # in bull markets, balanced tends to improve
             if wealth == "Low":
-                wealth_next = "Mid" if random.random() < 0.7 else "Low"
-            elif wealth == "Mid":
-                wealth_next = "High" if random.random() < 0.5 else "Mid"
-            else:
-                wealth_next = "High" if random.random() < 0.8 else "Mid"
-        else:
-            # in bear markets, balanced can slip
-            if wealth == "High":
-                wealth_next = "Mid" if random.random() < 0.5 else "High"
-            elif wealth == "Mid":
-                wealth_next = "Low" if random.random() < 0.3 else "Mid"
-            else:
-                wealth_next = "Low"
-    else:  # RiskOn
-        if market == "Bull":
-            # risk-on helps more often in bull markets
-            if wealth == "Low":
-                wealth_next = "Mid" if random.random() < 0.8 else "Low"
-            elif wealth == "Mid":
-                wealth_next = "High" if random.random() < 0.7 else "Mid"
-            else:
-                wealth_next = "High"
-        else:
-            # risk-on hurts more often in bear markets
-            if wealth == "High":
-                wealth_next = "Mid" if random.random() < 0.8 else "High"
-            elif wealth == "Mid":
-                wealth_next = "Low" if random.random() < 0.6 else "Mid"
-            else:
-                wealth_next = "Low"
+                return [("Mid", 0.7), ("Low", 0.3)]
+            if wealth == "Mid":
+                return [("High", 0.5), ("Mid", 0.5)]
+            return [("High", 0.8), ("Mid", 0.2)]
+        # in bear markets, balanced can slip
+        if wealth == "High":
+            return [("Mid", 0.5), ("High", 0.5)]
+        if wealth == "Mid":
+            return [("Low", 0.3), ("Mid", 0.7)]
+        return [("Low", 1.0)]
+    # RiskOn
+    if market == "Bull":
+        # risk-on helps more often in bull markets
+        if wealth == "Low":
+            return [("Mid", 0.8), ("Low", 0.2)]
+        if wealth == "Mid":
+            return [("High", 0.7), ("Mid", 0.3)]
+        return [("High", 1.0)]
+    # risk-on hurts more often in bear markets
+    if wealth == "High":
+        return [("Mid", 0.8), ("High", 0.2)]
+    if wealth == "Mid":
+        return [("Low", 0.6), ("Mid", 0.4)]
+    return [("Low", 1.0)]
+
+# CDF[s, a, k] = P(next state id <= k | s, a), built once from the rules above.
+# Market and wealth moves are independent given (s, a), so the joint is their product.
+CDF = np.zeros((len(states), len(actions), len(states)))
+for (w, m), sid in STATE_ID.items():
+    for a, aid in ACTION_ID.items():
+        for m2, pm in market_distribution(m):
+            for w2, pw in wealth_distribution(w, m, a):
+                CDF[sid, aid, STATE_ID[(w2, m2)]] += pm * pw
+CDF = CDF.cumsum(axis=2)
+CDF /= CDF[..., -1:]  # rows end at exactly 1.0
+_CDF_ROWS = CDF.tolist()  # plain lists: bisect on these beats np.searchsorted per call
+
+def transition_id(sid, aid, u):
+    """Next state id for the uniform draw u in [0, 1) (inverse CDF)."""
+    return bisect_right(_CDF_ROWS[sid][aid], u)
+
+def transition(s, a, u):
+    """
+    Stochastic transition: returns next_state for the uniform draw u.
+    - market regime follows a Markov chain
+    - wealth changes depending on regime + action
+    """
+    return decode(transition_id(encode(s), ACTION_ID[a], u))
 
-    return (wealth_next, market_next)
+# Wealth level ordering, and REWARD[s, s_next] = sign of the wealth change
+WEALTH_ORDER = {"Low": 0, "Mid": 1, "High": 2}
+REWARD = np.array(
+    [[np.sign(WEALTH_ORDER[w2] - WEALTH_ORDER[w]) for (w2, _) in states] for (w, _) in states],
+    dtype=np.int8,
+)
+_REWARD_ROWS = REWARD.tolist()
 
 def reward(s, a, s_next):
     """
     Reward: +1 if wealth goes up a level, -1 if it goes down, 0 otherwise.
-    (Simple "make money / lose money" signal.)
+    (Simple "make money / lose money" signal, looked up in REWARD.)
     """
-    order = {"Low": 0, "Mid": 1, "High": 2}
-    w, _ = s
-    w2, _ = s_next
-    if order[w2] > order[w]:
-        return 1
-    if order[w2] < order[w]:
-        return -1
-    return 0
+    return _REWARD_ROWS[encode(s)][encode(s_next)]
 
 # ----- A simple rollout (simulate an agent) -----
+@dataclass
+class Trajectory:
+    """Episode as parallel arrays of state/action ids; row 0 is the start (action -1)."""
+    states: np.ndarray
+    actions: np.ndarray
+    rewards: np.ndarray
+
+    def rows(self):
+        """Yield (state, action_taken_to_get_here, reward) with ids decoded."""
+        for s, a, r in zip(self.states, self.actions, self.rewards):
+            yield states[s], (actions[a] if a >= 0 else None), int(r)
+
 def run_episode(start=("Mid", "Bear"), steps=10, policy=None, seed=0):
-    random.seed(seed)
-    s = start
+    rng = np.random.default_rng(seed)
+    u = rng.random((steps, 2)).tolist()  # per step: (random action, transition) uniforms
+    s = encode(start)
     total = 0
-    trajectory = [(s, None, 0)]
+    traj_states = np.empty(steps + 1, dtype=np.uint8)
+    traj_actions = np.empty(steps + 1, dtype=np.int8)
+    traj_rewards = np.empty(steps + 1, dtype=np.int8)
+    traj_states[0], traj_actions[0], traj_rewards[0] = s, -1, 0
 
-    for t in range(steps):
-        # policy: a function that chooses an action given state
+    for t in range(1, steps + 1):
+        # policy: a function that chooses an action given the (wealth, market) state
+        u_action, u_next = u[t - 1]
         if policy is None:
-            a = random.choice(actions)  # random behavior
+            aid = int(u_action * len(actions))  # random behavior
         else:
-            a = policy(s)
+            aid = ACTION_ID[policy(DECODE[s])]
 
-        s_next = transition(s, a)
-        r = reward(s, a, s_next)
+        s_next = transition_id(s, aid, u_next)
+        r = _REWARD_ROWS[s][s_next]
 
         total += r
-        trajectory.append((s_next, a, r))
+        traj_states[t], traj_actions[t], traj_rewards[t] = s_next, aid, r
         s = s_next
 
-    return total, trajectory
+    return total, Trajectory(traj_states, traj_actions, traj_rewards)
 
 # Example policy: be cautious in Bear, take risk in Bull
+@lru_cache(maxsize=None)
 def simple_policy(s):
     wealth, market = s
     return "RiskOff" if market == "Bear" else "RiskOn"
 
+# ----- Exact evaluation (no sampling) -----
+def build_tensors():
+    """T[s, a, s'] from the transition CDF, and R[s, a] = sum_s' T[s, a, s'] REWARD[s, s']."""
+    T = np.diff(CDF, axis=2, prepend=0.0)
+    R = np.einsum("ijk,ik->ij", T, REWARD)
+    return T, R
+
+def policy_array(policy):
+    """Action id chosen by `policy` in each state, indexed by state id."""
+    return np.array([ACTION_ID[policy(s)] for s in states])
+
 if __name__ == "__main__":
     total, traj = run_episode(start=("Mid", "Bear"), steps=10, policy=simple_policy, seed=1)
     print("Total reward:", total)
     print("Trajectory (state, action_taken_to_get_here, reward):")
-    for item in traj:
-        print(item)
\ No newline at end of file
+    for item in traj.rows():
+        print(item)
+
+    T, R = build_tensors()
+    V_simple = policy_eval(policy_array(simple_policy), T, R)
+    V_opt, pi_opt = policy_iteration(T, R)
+    print("\nExact discounted values (gamma=0.95), simple_policy vs optimal:")
+    for s in states:
+        sid = STATE_ID[s]
+        print(f"  {s}: {V_simple[sid]:7.3f}  {V_opt[sid]:7.3f}  (optimal: {actions[pi_opt[sid]]})")
\ No newline at end of file
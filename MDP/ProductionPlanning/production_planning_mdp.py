@@ -1,4 +1,15 @@
-import random
+import importlib.util
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+_spec = importlib.util.spec_from_file_location(
+    "exact_solver", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exact_solver.py"))
+exact_solver = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(exact_solver)
+policy_eval, policy_iteration = exact_solver.policy_eval, exact_solver.policy_iteration
 
 # ----- MDP definition (toy Production Planning & Control) -----
 # We model a single-product, single-period-per-step planning problem.
@@ -25,6 +36,21 @@ CAP_HIGH = 5
 
 states = [(i, r) for i in range(MAX_INV + 1) for r in ["LowCap", "HighCap"]]
 
+# Packed state id used internally: (inv << 1) | cap_bit with LowCap = 0, HighCap = 1.
+# It equals the state's index in `states`.
+CAP_BIT = {"LowCap": 0, "HighCap": 1}
+STATE_ID = {s: i for i, s in enumerate(states)}
+DECODE = states
+
+def encode(s):
+    """(inv, capacity_regime) -> packed state id."""
+    inv, cap_reg = s
+    return (inv << 1) | CAP_BIT[cap_reg]
+
+def decode(sid):
+    """Packed state id -> (inv, capacity_regime)."""
+    return DECODE[sid]
+
 # Demand regimes are implicit in demand sampling; you can extend state to include it if desired.
 
 # --- Simple parameters ---
@@ -33,61 +59,64 @@ PROD_COST = 2              # cost per unit produced
 SETUP_COST = 2             # fixed cost if you produce > 0 (represents setup/changeover)
 HOLDING_COST = 1           # cost per unit of ending inventory
 BACKLOG_PENALTY = 5        # penalty per unit of unmet demand (lost sales / service penalty)
+CAP_STAY_PROB = 0.75       # capacity regime persists with this probability
+
+# Only two regimes, so capacities and action sets are built once (also by cap bit)
+_CAP = {"LowCap": CAP_LOW, "HighCap": CAP_HIGH}
+_ACTIONS_BY_REGIME = {reg: tuple(range(cap + 1)) for reg, cap in _CAP.items()}  # produce 0..cap
+CAP_BY_BIT = (CAP_LOW, CAP_HIGH)
+ACTIONS_BY_BIT = (_ACTIONS_BY_REGIME["LowCap"], _ACTIONS_BY_REGIME["HighCap"])
 
 def capacity_from_regime(regime):
-    return CAP_LOW if regime == "LowCap" else CAP_HIGH
+    return _CAP[regime]
 
-def sample_next_capacity_regime(regime):
-    """Capacity availability follows a 2-state Markov chain."""
-    u = random.random()
-    if regime == "LowCap":
-        return "LowCap" if u < 0.75 else "HighCap"
-    else:
-        return "HighCap" if u < 0.75 else "LowCap"
+# Simple demand distribution (can be swapped for something more realistic)
+DEMAND_VALUES = (0, 1, 2, 2, 3, 3, 4)
 
-def sample_demand():
-    """Stochastic customer demand (small integers)."""
-    # Simple demand distribution (can be swapped for something more realistic)
-    return random.choice([0, 1, 2, 2, 3, 3, 4])
+def sample_demand(u):
+    """Stochastic customer demand (small integers) for a uniform u in [0, 1)."""
+    return DEMAND_VALUES[int(u * len(DEMAND_VALUES))]
 
 def available_actions(state):
-    """Action set depends on capacity regime."""
-    inv, cap_reg = state
-    cap = capacity_from_regime(cap_reg)
-    return list(range(cap + 1))  # produce 0..cap
+    """Action set depends on capacity regime (a shared tuple; don't mutate)."""
+    return _ACTIONS_BY_REGIME[state[1]]
 
-def transition(s, a):
+def transition_int(sid, a, u_demand, u_regime):
     """
-    Stochastic transition: returns next_state plus info dict.
+    Stochastic transition on packed ids: returns (next_id, capacity, demand, sales, unmet, inv_after_prod).
     - production 'a' must be within current capacity (use available_actions)
-    - demand realized after production
+    - demand realized after production (uniform u_demand)
+    - capacity regime persists with prob CAP_STAY_PROB (uniform u_regime)
     """
-    inv, cap_reg = s
-    cap = capacity_from_regime(cap_reg)
+    inv, cap_bit = sid >> 1, sid & 1
+    cap = CAP_BY_BIT[cap_bit]
     if a < 0 or a > cap:
-        raise ValueError(f"Action {a} exceeds current capacity {cap} for regime {cap_reg}")
+        raise ValueError(f"Action {a} exceeds current capacity {cap} for regime {decode(sid)[1]}")
 
-    demand = sample_demand()
+    demand = sample_demand(u_demand)
 
     inv_after_prod = min(MAX_INV, inv + a)
     sales = min(inv_after_prod, demand)
     unmet = max(0, demand - inv_after_prod)
 
     inv_next = inv_after_prod - sales
-    cap_next = sample_next_capacity_regime(cap_reg)
-
-    s_next = (inv_next, cap_next)
-    info = {
-        "capacity": cap,
-        "produced": a,
-        "demand": demand,
-        "sales": sales,
-        "unmet": unmet,
-        "inv_after_prod": inv_after_prod,
-    }
-    return s_next, info
-
-def reward(s, a, s_next, info):
+    if u_regime >= CAP_STAY_PROB:
+        cap_bit ^= 1
+
+    return (inv_next << 1) | cap_bit, cap, demand, sales, unmet, inv_after_prod
+
+def transition(s, a, u_demand, u_regime):
+    """transition_int for (inv, capacity_regime) tuples."""
+    sid_next, cap, demand, sales, unmet, inv_after_prod = transition_int(encode(s), a, u_demand, u_regime)
+    return decode(sid_next), cap, demand, sales, unmet, inv_after_prod
+
+def reward_int(a, sid_next, sales, unmet):
+    """One-step profit (see `reward`) with the next state as a packed id."""
+    setup = SETUP_COST if a > 0 else 0
+    return (PRICE_PER_UNIT * sales - PROD_COST * a - setup
+            - HOLDING_COST * (sid_next >> 1) - BACKLOG_PENALTY * unmet)
+
+def reward(s, a, s_next, sales, unmet):
     """
     Reward = one-step profit:
     - revenue from sales
@@ -95,8 +124,6 @@ def reward(s, a, s_next, info):
     - holding cost on ending inventory
     - penalty for unmet demand (lost sales/backlog penalty)
     """
-    sales = info["sales"]
-    unmet = info["unmet"]
     inv_next, _ = s_next
 
     revenue = PRICE_PER_UNIT * sales
@@ -108,33 +135,67 @@ def reward(s, a, s_next, info):
     return revenue - prod_cost - setup - holding - backlog
 
 # ----- A simple rollout (simulate a planner/controller) -----
+INFO_FIELDS = ("capacity", "produced", "demand", "sales", "unmet", "inv_after_prod")
+
+@dataclass
+class Trajectory:
+    """
+    Episode as structure-of-arrays. Row 0 holds the start state (action -1, reward 0);
+    `states` are packed ids (indices into `states`), `info` maps each INFO_FIELDS name to an array.
+    """
+    states: np.ndarray
+    actions: np.ndarray
+    rewards: np.ndarray
+    info: dict
+
+    def rows(self):
+        """Yield (state, action_taken_to_get_here, reward, info) tuples for printing."""
+        yield states[self.states[0]], None, 0, {"note": "start"}
+        for t in range(1, len(self.states)):
+            info = {k: int(self.info[k][t]) for k in INFO_FIELDS}
+            yield states[self.states[t]], int(self.actions[t]), int(self.rewards[t]), info
+
 def run_episode(start=(3, "HighCap"), steps=12, policy=None, seed=0):
-    random.seed(seed)
-    s = start
+    rng = np.random.default_rng(seed)
+    u = rng.random((steps, 3)).tolist()  # per step: (random action, demand, regime) uniforms
+    s = encode(start)
     total = 0
-    trajectory = [(s, None, 0, {"note": "start"})]
-
-    for t in range(steps):
-        # policy: chooses production quantity given state
+    traj_states = np.empty(steps + 1, dtype=np.uint8)
+    traj_actions = np.empty(steps + 1, dtype=np.int16)
+    traj_rewards = np.empty(steps + 1, dtype=np.int32)
+    # "produced" is the action itself, so it shares the actions buffer
+    info = {k: np.empty(steps + 1, dtype=np.int16) for k in INFO_FIELDS if k != "produced"}
+    info["produced"] = traj_actions
+    cap_buf, demand_buf, sales_buf = info["capacity"], info["demand"], info["sales"]
+    unmet_buf, after_prod_buf = info["unmet"], info["inv_after_prod"]
+    traj_states[0], traj_actions[0], traj_rewards[0] = s, -1, 0
+
+    for t in range(1, steps + 1):
+        # policy: chooses production quantity given the (inv, capacity_regime) state
+        u_action, u_demand, u_regime = u[t - 1]
         if policy is None:
-            a = random.choice(available_actions(s))
+            choices = ACTIONS_BY_BIT[s & 1]
+            a = choices[int(u_action * len(choices))]
         else:
-            a = policy(s)
+            a = policy(DECODE[s])
 
-        s_next, info = transition(s, a)
-        r = reward(s, a, s_next, info)
+        s_next, cap, demand, sales, unmet, inv_after_prod = transition_int(s, a, u_demand, u_regime)
+        r = reward_int(a, s_next, sales, unmet)
 
         total += r
-        trajectory.append((s_next, a, r, info))
+        traj_states[t], traj_actions[t], traj_rewards[t] = s_next, a, r
+        cap_buf[t], demand_buf[t], sales_buf[t] = cap, demand, sales
+        unmet_buf[t], after_prod_buf[t] = unmet, inv_after_prod
         s = s_next
 
-    return total, trajectory
+    return total, Trajectory(traj_states, traj_actions, traj_rewards, info)
 
 # Example heuristic policy:
 # - target inventory around TARGET level
 # - produce more if inventory is below target, within capacity
 TARGET_INV = 4
 
+@lru_cache(maxsize=None)
 def simple_production_policy(s):
     inv, cap_reg = s
     cap = capacity_from_regime(cap_reg)
@@ -143,9 +204,49 @@ def simple_production_policy(s):
         return 0
     return min(cap, gap)
 
+# ----- Exact evaluation (no sampling) -----
+# Action index = production quantity 0..CAP_HIGH; quantities above the current
+# capacity are invalid and get R = -inf (and no transitions).
+def build_tensors():
+    """
+    Exact model as arrays: T[s, a, s'] = P(s' | s, a), R[s, a] = E[reward | s, a],
+    obtained by enumerating demand values and capacity regime switches.
+    """
+    n_actions = CAP_HIGH + 1
+    T = np.zeros((len(states), n_actions, len(states)))
+    R = np.full((len(states), n_actions), -np.inf)
+    p_d = 1.0 / len(DEMAND_VALUES)
+    for s, sid in STATE_ID.items():
+        inv, cap_reg = s
+        other = "HighCap" if cap_reg == "LowCap" else "LowCap"
+        cap_dist = [(cap_reg, CAP_STAY_PROB), (other, 1.0 - CAP_STAY_PROB)]
+        for a in available_actions(s):
+            R[sid, a] = 0.0
+            inv_after_prod = min(MAX_INV, inv + a)
+            for demand in DEMAND_VALUES:
+                sales = min(inv_after_prod, demand)
+                unmet = max(0, demand - inv_after_prod)
+                inv_next = inv_after_prod - sales
+                R[sid, a] += p_d * reward(s, a, (inv_next, cap_reg), sales, unmet)
+                for cap_next, p_c in cap_dist:
+                    T[sid, a, STATE_ID[(inv_next, cap_next)]] += p_d * p_c
+    return T, R
+
+def policy_array(policy):
+    """Production quantity chosen by `policy` in each state, indexed by state id."""
+    return np.array([policy(s) for s in states])
+
 if __name__ == "__main__":
     total, traj = run_episode(start=(3, "HighCap"), steps=12, policy=simple_production_policy, seed=1)
     print("Total reward:", total)
     print("Trajectory (state, action_taken_to_get_here, reward, info):")
-    for item in traj:
+    for item in traj.rows():
         print(item)
+
+    T, R = build_tensors()
+    V_heur = policy_eval(policy_array(simple_production_policy), T, R)
+    V_opt, pi_opt = policy_iteration(T, R)
+    print("\nExact discounted values (gamma=0.95), heuristic vs optimal:")
+    for s in states:
+        sid = STATE_ID[s]
+        print(f"  {s}: {V_heur[sid]:8.3f}  {V_opt[sid]:8.3f}  (optimal production: {pi_opt[sid]})")
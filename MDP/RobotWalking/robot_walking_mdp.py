@@ -1,4 +1,16 @@
-import random
+import importlib.util
+import os
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+_spec = importlib.util.spec_from_file_location(
+    "exact_solver", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exact_solver.py"))
+exact_solver = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(exact_solver)
+policy_eval, policy_iteration = exact_solver.policy_eval, exact_solver.policy_iteration
 
 # ----- MDP definition (toy robot walking / locomotion) -----
 # We model a very simple 1D "walker" that tries to move forward without falling.
@@ -16,136 +28,214 @@ import random
 # Reward encourages forward progress, penalizes falling, and ends episode at goal or fall.
 
 GOAL = 10
-states = [(pos, st) for pos in range(GOAL + 1) for st in ["Stable", "Wobbly", "Fallen"]]
+STABILITY = ["Stable", "Wobbly", "Fallen"]
+states = [(pos, st) for pos in range(GOAL + 1) for st in STABILITY]
 actions = ["SmallStep", "BigStep", "Recover"]
 
+# Internally a state is an int: position * 3 + stability index (Stable = 0,
+# Wobbly = 1, Fallen = 2), i.e. its index in `states`; actions are indices into `actions`.
+STABLE, WOBBLY, FALLEN = range(3)
+STATE_ID = {s: i for i, s in enumerate(states)}
+ACTION_ID = {a: i for i, a in enumerate(actions)}
+DECODE = states
+
+def encode(s):
+    """(position, stability) -> state id."""
+    return STATE_ID[s]
+
+def decode(sid):
+    """State id -> (position, stability)."""
+    return DECODE[sid]
+
+# Reward terms
+FALL_PENALTY = -10      # reward when the robot falls (replaces everything else)
+WOBBLY_PENALTY = -0.5   # for ending a step wobbly
+GOAL_BONUS = 5          # for reaching the goal
+PROGRESS_COEF = 1       # per unit of forward progress
+ARRIVAL_PENALTY = {"Stable": 0, "Wobbly": WOBBLY_PENALTY}
+_ARRIVAL_BY_ID = [ARRIVAL_PENALTY["Stable"], ARRIVAL_PENALTY["Wobbly"]]
+
 def is_terminal(s):
     pos, st = s
     return st == "Fallen" or pos >= GOAL
 
-def transition(s, a):
-    """Stochastic transition: returns next_state."""
+def is_terminal_int(sid):
+    return sid % 3 == FALLEN or sid // 3 >= GOAL
+
+def next_state_distribution(s, a):
+    """
+    {next_state: prob}. Position and stability outcomes are independent, so the
+    joint is the product of the two marginals.
+    """
     pos, st = s
     if st == "Fallen":
-        return s  # absorbing
-
-    # Helper random
-    u = random.random()
-
+        return {s: 1.0}  # absorbing
     # If you're wobbly, you're more likely to fall on steps
     wobble_factor = 0.0 if st == "Stable" else 0.15
 
     if a == "SmallStep":
-        # +1 progress most of the time, small chance of no progress
-        # stability may worsen a bit; fall is rare
-        if u < 0.75:
-            pos_next = min(GOAL, pos + 1)
-        else:
-            pos_next = pos
-
-        # stability transition
-        v = random.random()
-        if v < 0.80:
-            st_next = st  # keep
-        elif v < 0.95:
-            st_next = "Wobbly"
-        else:
-            st_next = "Fallen" if random.random() < wobble_factor else "Wobbly"
-
+        # +1 progress most of the time; stability may worsen a bit, fall is rare
+        pos_dist = [(min(GOAL, pos + 1), 0.75), (pos, 0.25)]
+        st_dist = [(st, 0.80), ("Wobbly", 0.15),
+                   ("Fallen", 0.05 * wobble_factor), ("Wobbly", 0.05 * (1.0 - wobble_factor))]
     elif a == "BigStep":
         # More progress (+2) but higher chance to get wobbly or fall
-        if u < 0.70:
-            pos_next = min(GOAL, pos + 2)
-        elif u < 0.90:
-            pos_next = min(GOAL, pos + 1)
-        else:
-            pos_next = pos
-
-        v = random.random()
-        # chance to become wobbly or fall
+        pos_dist = [(min(GOAL, pos + 2), 0.70), (min(GOAL, pos + 1), 0.20), (pos, 0.10)]
         fall_chance = 0.05 + wobble_factor
-        if v < 0.60:
-            st_next = "Wobbly"
-        elif v < 1.0 - fall_chance:
-            st_next = st
-        else:
-            st_next = "Fallen"
-
-    else:  # Recover
-        # Often improves stability, but may lose 1 position due to corrective motion
-        if u < 0.40:
-            pos_next = max(0, pos - 1)
-        else:
-            pos_next = pos
-
-        v = random.random()
-        if v < 0.70:
-            st_next = "Stable"
-        elif v < 0.95:
-            st_next = "Wobbly"
-        else:
-            st_next = "Fallen"  # rare slip during recovery
-
-    return (pos_next, st_next)
+        st_dist = [("Wobbly", 0.60), (st, 0.40 - fall_chance), ("Fallen", fall_chance)]
+    else:  # Recover: often improves stability, may lose 1 position
+        pos_dist = [(max(0, pos - 1), 0.40), (pos, 0.60)]
+        st_dist = [("Stable", 0.70), ("Wobbly", 0.25), ("Fallen", 0.05)]
+
+    dist = {}
+    for pos_next, p_pos in pos_dist:
+        for st_next, p_st in st_dist:
+            if p_pos * p_st > 0.0:
+                key = (pos_next, st_next)
+                dist[key] = dist.get(key, 0.0) + p_pos * p_st
+    return dist
+
+def build_next_tables():
+    """
+    Joint next-state outcomes per (state id, action id): NEXT_STATE[sid, aid, k]
+    and their CDF, padded with the last outcome (CDF 1.0) to a common width.
+    """
+    dists = [[list(next_state_distribution(s, a).items()) for a in actions] for s in states]
+    width = max(len(d) for row in dists for d in row)
+    next_state = np.zeros((len(states), len(actions), width), dtype=np.uint8)
+    next_cdf = np.ones((len(states), len(actions), width))
+    for sid, row in enumerate(dists):
+        for aid, dist in enumerate(row):
+            ids = [STATE_ID[s_next] for s_next, _ in dist]
+            next_state[sid, aid, :] = ids[-1]
+            next_state[sid, aid, :len(ids)] = ids
+            next_cdf[sid, aid, :len(ids)] = np.cumsum([p for _, p in dist])
+            next_cdf[sid, aid, len(ids) - 1:] = 1.0  # guard against round-off
+    return next_state, next_cdf
+
+NEXT_STATE, NEXT_CDF = build_next_tables()
+_NEXT_STATE_ROWS = NEXT_STATE.tolist()  # list copies for fast scalar indexing
+_NEXT_CDF_ROWS = NEXT_CDF.tolist()
+
+def transition_int(sid, aid, u):
+    """Stochastic transition on ids: one uniform u in [0, 1) picks the joint next state."""
+    return _NEXT_STATE_ROWS[sid][aid][bisect_right(_NEXT_CDF_ROWS[sid][aid], u)]
+
+def transition(s, a, u):
+    """Stochastic transition on (position, stability) tuples; see transition_int."""
+    return decode(transition_int(encode(s), ACTION_ID[a], u))
 
 def reward(s, a, s_next):
     """Reward encourages forward progress, penalizes falling."""
-    pos, st = s
+    pos, _ = s
     pos2, st2 = s_next
 
     if st2 == "Fallen":
-        return -10
-
-    # reward for forward progress
-    progress = pos2 - pos
-    r = progress  # +1 or +2 typical
+        return FALL_PENALTY
 
-    # small penalty for spending time wobbly (encourage stability)
-    if st2 == "Wobbly":
-        r -= 0.5
+    # forward progress (+1 or +2 typical), wobbly penalty, goal bonus
+    return PROGRESS_COEF * (pos2 - pos) + ARRIVAL_PENALTY[st2] + GOAL_BONUS * (pos2 >= GOAL)
 
-    # bonus for reaching goal
-    if pos2 >= GOAL:
-        r += 5
-
-    return r
+def reward_int(sid, sid_next):
+    """reward() on state ids (the action does not enter the reward)."""
+    pos2, st2 = divmod(sid_next, 3)
+    if st2 == FALLEN:
+        return FALL_PENALTY
+    return PROGRESS_COEF * (pos2 - sid // 3) + _ARRIVAL_BY_ID[st2] + GOAL_BONUS * (pos2 >= GOAL)
 
 # ----- A simple rollout (simulate an agent) -----
+@dataclass
+class Trajectory:
+    """
+    Episode as parallel arrays; row 0 is the start state with action -1.
+    Episodes can stop early, so the arrays are trimmed to the steps actually taken.
+    """
+    states: np.ndarray
+    actions: np.ndarray
+    rewards: np.ndarray
+
+    def rows(self):
+        """Yield (state, action_taken_to_get_here, reward) with ids decoded."""
+        for s, a, r in zip(self.states, self.actions, self.rewards):
+            r = float(r)
+            yield states[s], (actions[a] if a >= 0 else None), (int(r) if r.is_integer() else r)
+
 def run_episode(start=(0, "Stable"), steps=30, policy=None, seed=0):
-    random.seed(seed)
-    s = start
+    rng = np.random.default_rng(seed)
+    u = rng.random((steps, 2)).tolist()  # per step: (random action, transition) uniforms
+    s = encode(start)
     total = 0
-    trajectory = [(s, None, 0)]
+    traj_states = np.empty(steps + 1, dtype=np.uint8)
+    traj_actions = np.empty(steps + 1, dtype=np.int8)
+    traj_rewards = np.empty(steps + 1, dtype=np.float64)
+    traj_states[0], traj_actions[0], traj_rewards[0] = s, -1, 0
+    n = 1
 
     for t in range(steps):
-        if is_terminal(s):
+        if is_terminal_int(s):
             break
 
+        u_action, u_next = u[t]
         if policy is None:
-            a = random.choice(actions)
+            aid = int(u_action * len(actions))
         else:
-            a = policy(s)
+            aid = ACTION_ID[policy(DECODE[s])]
 
-        s_next = transition(s, a)
-        r = reward(s, a, s_next)
+        s_next = transition_int(s, aid, u_next)
+        r = reward_int(s, s_next)
 
         total += r
-        trajectory.append((s_next, a, r))
+        traj_states[n], traj_actions[n], traj_rewards[n] = s_next, aid, r
+        n += 1
         s = s_next
 
-    return total, trajectory
+    return total, Trajectory(traj_states[:n], traj_actions[:n], traj_rewards[:n])
 
 # Example policy:
 # - If wobbly, recover; otherwise take big steps to move fast
+@lru_cache(maxsize=None)
 def simple_walking_policy(s):
     pos, st = s
     if st == "Wobbly":
         return "Recover"
     return "BigStep"
 
+# ----- Exact evaluation (no sampling) -----
+def build_tensors():
+    """
+    T[s, a, s'] = P(s' | s, a) and R[s, a] = E[reward | s, a].
+    Terminal states (fallen or at the goal) are absorbing with zero reward,
+    matching run_episode, which stops there.
+    """
+    T = np.zeros((len(states), len(actions), len(states)))
+    R = np.zeros((len(states), len(actions)))
+    for s, sid in STATE_ID.items():
+        for a, aid in ACTION_ID.items():
+            if is_terminal(s):
+                T[sid, aid, sid] = 1.0
+                continue
+            for s_next, p in next_state_distribution(s, a).items():
+                T[sid, aid, STATE_ID[s_next]] += p
+                R[sid, aid] += p * reward(s, a, s_next)
+    return T, R
+
+def policy_array(policy):
+    """Action ids of `policy` per state id (terminal states get action 0; it has no effect)."""
+    return np.array([0 if is_terminal(s) else ACTION_ID[policy(s)] for s in states])
+
 if __name__ == "__main__":
     total, traj = run_episode(start=(0, "Stable"), steps=30, policy=simple_walking_policy, seed=1)
     print("Total reward:", total)
     print("Trajectory (state, action_taken_to_get_here, reward):")
-    for item in traj:
+    for item in traj.rows():
         print(item)
+
+    T, R = build_tensors()
+    V_simple = policy_eval(policy_array(simple_walking_policy), T, R)
+    V_opt, pi_opt = policy_iteration(T, R)
+    print("\nExact discounted values (gamma=0.95), simple_walking_policy vs optimal:")
+    for s in states:
+        if is_terminal(s):
+            continue
+        sid = STATE_ID[s]
+        print(f"  {s}: {V_simple[sid]:7.3f}  {V_opt[sid]:7.3f}  (optimal: {actions[pi_opt[sid]]})")
@@ -0,0 +1,33 @@
+"""
+Exact tabular solvers shared by the small MDPs in this folder.
+
+Each MDP script exports build_tensors() -> (T, R) with T[s, a, s'] = P(s' | s, a)
+and R[s, a] = E[reward | s, a], plus policy_array(policy) to tabulate a policy
+as one action index per state id. Everything here is dense linear algebra over
+the whole state space, fine for a few dozen states but not for large ones.
+"""
+import numpy as np
+
+
+def policy_eval(pi, T, R, gamma=0.95):
+    """Exact V of the stationary policy pi (action index per state): V = (I - gamma P_pi)^-1 r_pi."""
+    idx = np.arange(len(pi))
+    return np.linalg.solve(np.eye(len(pi)) - gamma * T[idx, pi], R[idx, pi])
+
+
+def policy_iteration(T, R, gamma=0.95):
+    """
+    Howard's policy iteration from pi = action 0 everywhere; returns (V*, pi*)
+    with pi* as action indices. A state only switches action on a strict gain,
+    so ties can't make it cycle.
+    """
+    idx = np.arange(T.shape[0])
+    pi = np.zeros(T.shape[0], dtype=int)
+    while True:
+        V = policy_eval(pi, T, R, gamma)
+        Q = R + gamma * T @ V
+        best = Q.argmax(axis=1)
+        new_pi = np.where(Q[idx, best] > Q[idx, pi] + 1e-12, best, pi)
+        if (new_pi == pi).all():
+            return V, pi
+        pi = new_pi
@@ -1,5 +1,15 @@
 import random
 
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional: simulate_episode_c then runs as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
 # -----------------------------
 # MRP definition (from diagram)
 # -----------------------------
@@ -25,26 +35,66 @@ R = {
 }
 
 GAMMA = 0.99
+_MAX_EP_LEN = 10_000
+GAMMA_POW = GAMMA ** np.arange(_MAX_EP_LEN)  # GAMMA_POW[t] = GAMMA**t, computed once
 START_STATE = "Class1"
 TERMINAL_STATE = "Sleep"
 
+# Dense encoding of the same chain (for batched simulation)
+STATE_NAMES = list(P)
+S2I = {s: i for i, s in enumerate(STATE_NAMES)}
+START = S2I[START_STATE]
+TERMINAL = S2I[TERMINAL_STATE]
+
+# CDF[s, j] = P(next state index <= j | s); each non-terminal row ends at exactly 1.0
+CDF = np.zeros((len(STATE_NAMES), len(STATE_NAMES)))
+for s, outs in P.items():
+    for s_next, prob in outs:
+        CDF[S2I[s], S2I[s_next]] += prob
+CDF = CDF.cumsum(axis=1)
+_rows = CDF[:, -1] > 0
+CDF[_rows] /= CDF[_rows, -1:]
+RVEC = np.array([R[s] for s in STATE_NAMES], dtype=np.float64)
+
 # -----------------------------
 # Sampling helpers
 # -----------------------------
 
+def build_alias(probs):
+    """
+    Walker's alias tables for a discrete distribution.
+    Returns (prob_table, alias_table): draw i uniformly, keep i with prob_table[i],
+    otherwise take alias_table[i].
+    """
+    k = len(probs)
+    prob_table = [p * k for p in probs]
+    alias_table = list(range(k))
+    small = [i for i, p in enumerate(prob_table) if p < 1.0]
+    large = [i for i, p in enumerate(prob_table) if p >= 1.0]
+    while small and large:
+        lo, hi = small.pop(), large.pop()
+        alias_table[lo] = hi
+        prob_table[hi] -= 1.0 - prob_table[lo]
+        (small if prob_table[hi] < 1.0 else large).append(hi)
+    # Leftovers are 1.0 up to rounding error
+    for i in small + large:
+        prob_table[i] = 1.0
+    return prob_table, alias_table
+
+# state -> (next_states, prob_table, alias_table), built once
+ALIAS = {
+    s: (tuple(s_next for s_next, _ in outs),) + tuple(build_alias([p for _, p in outs]))
+    for s, outs in P.items()
+    if outs
+}
+
 def sample_next_state(state: str) -> str:
-    """Sample next state using the transition probabilities P."""
-    choices = P[state]
-    if not choices:
+    """Sample next state from P in O(1) using the precomputed alias tables."""
+    if state not in ALIAS:
         return state  # terminal or no outgoing edges
-    r = random.random()
-    cumulative = 0.0
-    for s_next, prob in choices:
-        cumulative += prob
-        if r <= cumulative:
-            return s_next
-    # Safety fallback for floating point sums like 0.999999
-    return choices[-1][0]
+    nexts, prob_table, alias_table = ALIAS[state]
+    i = random.randrange(len(nexts))
+    return nexts[i] if random.random() < prob_table[i] else nexts[alias_table[i]]
 
 def simulate_episode(seed: int = None):
     """Simulate one episode until TERMINAL_STATE. Returns (path, rewards, G)."""
@@ -61,13 +111,72 @@ def simulate_episode(seed: int = None):
         path.append(state)
         rewards.append(R[state])
 
-    # Compute discounted return G = r0 + γ r1 + γ^2 r2 + ...
-    G = 0.0
-    for t, rt in enumerate(rewards):
-        G += (GAMMA ** t) * rt
+    # Compute discounted return G = r0 + γ r1 + γ^2 r2 + ... as one dot product
+    n = len(rewards)
+    gamma_pow = GAMMA_POW[:n] if n <= _MAX_EP_LEN else GAMMA ** np.arange(n)
+    G = float(gamma_pow @ np.asarray(rewards, dtype=np.float64))
 
     return path, rewards, G
 
+@njit(cache=True)
+def _simulate(cdf, rvec, start, terminal, gamma, out_path, seed):
+    """
+    One episode on the dense encoding (compiled by numba): writes the visited
+    state ids into out_path and returns (length, G, done). Stops early if
+    out_path is full, with done False.
+    """
+    if seed >= 0:
+        random.seed(seed)
+    state = start
+    out_path[0] = state
+    G = rvec[state]
+    gpow = 1.0
+    n = 1
+    while state != terminal and n < out_path.shape[0]:
+        state = np.searchsorted(cdf[state], random.random(), side="right")
+        out_path[n] = state
+        gpow *= gamma
+        G += gpow * rvec[state]
+        n += 1
+    return n, G, state == terminal
+
+def simulate_episode_c(out_path=None, seed: int = None):
+    """
+    simulate_episode() without interpreter overhead: state ids go into the
+    preallocated int8 buffer out_path (STATE_NAMES decodes them).
+    Returns (length, G, done); the path is out_path[:length]. The episode stops
+    when out_path is full (_MAX_EP_LEN states by default): done is then False
+    and G is the truncated return.
+    seed seeds numba's own generator; without numba it reseeds the global
+    random module, like simulate_episode(seed).
+    """
+    if out_path is None:
+        out_path = np.empty(_MAX_EP_LEN, dtype=np.int8)
+    return _simulate(CDF, RVEC, START, TERMINAL, GAMMA, out_path, -1 if seed is None else seed)
+
+def run_many_batched(num_episodes: int = 10000, max_len: int = 1000, seed: int = 0):
+    """
+    Simulate num_episodes episodes in lock-step and return their discounted returns.
+    Each step draws one uniform per episode and picks the next state from the CDF rows.
+    Episodes still running after max_len steps are truncated.
+    """
+    rng = np.random.default_rng(seed)
+    s = np.full(num_episodes, START, dtype=np.int8)
+    active = np.ones(num_episodes, dtype=bool)  # still collecting rewards
+    G = np.zeros(num_episodes)
+    gpow = 1.0
+
+    for _ in range(max_len):
+        G += gpow * RVEC[s] * active
+        active &= s != TERMINAL  # the terminal reward is counted once, then stop
+        if not active.any():
+            break
+        u = rng.random(num_episodes)
+        s = np.where(active, (CDF[s] > u[:, None]).argmax(axis=1), s)
+        gpow *= GAMMA
+
+    return G
+
 def run_many(num_episodes: int = 20, seed: int = 0):
     random.seed(seed)
 
@@ -94,4 +203,12 @@ def run_many(num_episodes: int = 20, seed: int = 0):
     print("Rewards:", best_rewards)
 
 if __name__ == "__main__":
-    run_many(num_episodes=30, seed=42)
\ No newline at end of file
+    run_many(num_episodes=30, seed=42)
+
+    G = run_many_batched(num_episodes=100000, seed=42)
+    print(f"\nBatched estimate over {len(G)} episodes: E[G] ~ {G.mean():.3f}")
+
+    buf = np.empty(_MAX_EP_LEN, dtype=np.int8)
+    simulate_episode_c(buf, seed=42)
+    G_c = [simulate_episode_c(buf)[1] for _ in range(100000)]
+    print(f"Compiled estimate over {len(G_c)} episodes: E[G] ~ {np.mean(G_c):.3f}")
\ No newline at end of file
@@ -1,6 +1,14 @@
 import numpy as np
 import random
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional: the training loop then runs as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
 # ----------------------------
 # 1) Define the grid (YOU fill)
 # ----------------------------
@@ -56,65 +64,156 @@ ROWS, COLS, START, GOAL, WALLS = parse_grid(GRID)
 def in_bounds(r, c):
     return 0 <= r < ROWS and 0 <= c < COLS
 
-def step(state, action_idx):
-    """Deterministic move: bump into walls/bounds -> stay."""
-    r, c = state
-    dr, dc = A2D[action_idx]
-    nr, nc = r + dr, c + dc
+def build_step_tables():
+    """
+    Tabulate the deterministic move for every (r, c, action) once:
+    next row, next col and done flag. Bump into walls/bounds -> stay.
+    """
+    nr_t = np.empty((ROWS, COLS, len(ACTIONS)), dtype=np.int8)
+    nc_t = np.empty_like(nr_t)
+    done_t = np.zeros((ROWS, COLS, len(ACTIONS)), dtype=bool)
+    for r in range(ROWS):
+        for c in range(COLS):
+            for a, (dr, dc) in A2D.items():
+                nr, nc = r + dr, c + dc
+                if (not in_bounds(nr, nc)) or ((nr, nc) in WALLS):
+                    nr, nc = r, c  # blocked
+                nr_t[r, c, a], nc_t[r, c, a] = nr, nc
+                done_t[r, c, a] = (nr, nc) == GOAL
+    return nr_t, nc_t, done_t
 
-    if (not in_bounds(nr, nc)) or ((nr, nc) in WALLS):
-        nr, nc = r, c  # blocked
+NR, NC, DONE = build_step_tables()
 
-    next_state = (nr, nc)
-    reward = STEP_REWARD
-    done = (next_state == GOAL)
-    return next_state, reward, done
+def step(state, action_idx):
+    """Deterministic move via the step tables: returns (next_state, reward, done)."""
+    r, c = state
+    next_state = (int(NR[r, c, action_idx]), int(NC[r, c, action_idx]))
+    return next_state, STEP_REWARD, bool(DONE[r, c, action_idx])
 
 # ----------------------------
 # 3) Q-learning
 # ----------------------------
-Q = np.zeros((ROWS, COLS, len(ACTIONS)), dtype=float)
+# float32 is plenty for a tabular maze and halves the memory traffic of every Q access.
+Q = np.zeros((ROWS, COLS, len(ACTIONS)), dtype=np.float32)
+
+def eps_greedy(r, c, epsilon, Q):
+    """
+    Epsilon-greedy action at (r, c): `random` for both branches and an
+    unrolled 4-way argmax (first max wins, like np.argmax).
+    """
+    if random.random() < epsilon:
+        return random.randrange(4)
+    v0, v1, v2, v3 = Q[r, c, 0], Q[r, c, 1], Q[r, c, 2], Q[r, c, 3]
+    b, m = 0, v0
+    if v1 > m:
+        b, m = 1, v1
+    if v2 > m:
+        b, m = 2, v2
+    if v3 > m:
+        b = 3
+    return b
 
 def epsilon_greedy_action(state, epsilon):
     r, c = state
-    if random.random() < epsilon:
-        return random.randrange(len(ACTIONS))
-    return int(np.argmax(Q[r, c, :]))
+    return eps_greedy(r, c, epsilon, Q)
 
-def train(
-    episodes=5000,
-    alpha=0.1,
-    gamma=0.99,
-    epsilon_start=1.0,
-    epsilon_end=0.05,
-    epsilon_decay=0.999,
-    max_steps_per_episode=500
-):
+# Compiled copy for _train_loop; it draws from numba's own RNG, while the
+# Python eps_greedy above keeps following random.seed
+_eps_greedy_nb = njit(cache=True)(eps_greedy)
+
+@njit(cache=True)
+def _train_loop(Q, nr_t, nc_t, done_t, start_r, start_c, episodes, alpha, gamma,
+                epsilon_start, epsilon_end, epsilon_decay, max_steps_per_episode,
+                step_reward, seed):
+    """Q-learning episodes on int coordinates and the step tables (compiled by numba)."""
+    if seed >= 0:
+        random.seed(seed)
     epsilon = epsilon_start
 
-    for ep in range(episodes):
-        state = START
+    for _ in range(episodes):
+        r, c = start_r, start_c
 
         for _ in range(max_steps_per_episode):
-            a = epsilon_greedy_action(state, epsilon)
-            next_state, reward, done = step(state, a)
-
-            r, c = state
-            nr, nc = next_state
+            a = _eps_greedy_nb(r, c, epsilon, Q)
+            nr, nc, done = nr_t[r, c, a], nc_t[r, c, a], done_t[r, c, a]
 
             # Q-learning update:
             # Q(s,a) <- Q(s,a) + alpha * (r + gamma*max_a' Q(s',a') - Q(s,a))
-            td_target = reward + (0.0 if done else gamma * np.max(Q[nr, nc, :]))
+            td_target = step_reward
+            if not done:
+                td_target += gamma * np.max(Q[nr, nc])
             td_error = td_target - Q[r, c, a]
             Q[r, c, a] += alpha * td_error
 
-            state = next_state
+            r, c = nr, nc
             if done:
                 break
 
         # decay epsilon
         epsilon = max(epsilon_end, epsilon * epsilon_decay)
 
+def train(
+    episodes=5000,
+    alpha=0.1,
+    gamma=0.99,
+    epsilon_start=1.0,
+    epsilon_end=0.05,
+    epsilon_decay=0.999,
+    max_steps_per_episode=500,
+    seed=None
+):
+    """
+    Train the global Q in place. Numba keeps its own RNG state, so pass `seed`
+    for reproducible runs (seeding `random` from outside doesn't reach it).
+    The update constants are cast to float32 so Q is never upcast.
+    """
+    _train_loop(
+        Q, NR, NC, DONE, START[0], START[1], episodes, np.float32(alpha), np.float32(gamma),
+        epsilon_start, epsilon_end, epsilon_decay, max_steps_per_episode,
+        np.float32(STEP_REWARD), -1 if seed is None else seed,
+    )
+
+def train_batched(
+    episodes=8000,
+    batch_size=32,
+    alpha=0.1,
+    gamma=0.99,
+    epsilon_start=1.0,
+    epsilon_end=0.05,
+    epsilon_decay=0.999,
+    max_steps_per_episode=500
+):
+    """
+    Q-learning with batch_size agents exploring in parallel and sharing Q.
+    Episode k uses the same epsilon as in train(); all agents of a step read the
+    same Q, and np.add.at accumulates updates that hit the same (s, a).
+    """
+    alpha, gamma = np.float32(alpha), np.float32(gamma)
+    for first in range(0, episodes, batch_size):
+        n = min(batch_size, episodes - first)
+        eps = np.maximum(epsilon_end, epsilon_start * epsilon_decay ** np.arange(first, first + n))
+        rows = np.full(n, START[0], dtype=np.int8)
+        cols = np.full(n, START[1], dtype=np.int8)
+        active = np.ones(n, dtype=bool)
+
+        for _ in range(max_steps_per_episode):
+            idx = np.flatnonzero(active)
+            if idx.size == 0:
+                break
+            r, c = rows[idx], cols[idx]
+
+            greedy = Q[r, c].argmax(axis=1)
+            explore = np.random.randint(0, len(ACTIONS), idx.size)
+            a = np.where(np.random.random(idx.size) < eps[idx], explore, greedy)
+
+            nr, nc, done = NR[r, c, a], NC[r, c, a], DONE[r, c, a]
+            td_target = STEP_REWARD + gamma * Q[nr, nc].max(axis=1) * ~done
+            td_error = td_target - Q[r, c, a]
+            np.add.at(Q, (r, c, a), alpha * td_error)
+
+            rows[idx], cols[idx] = nr, nc
+            active[idx[done]] = False
+
 def extract_greedy_policy_path(max_steps=500):
     """Follow greedy policy from START to GOAL after training."""
     state = START
@@ -148,10 +247,14 @@ def print_policy():
     print("\n".join(out))
 
 if __name__ == "__main__":
+    # random / np.random drive epsilon_greedy_action and train_batched; train()
+    # runs on numba's RNG and is seeded through its seed argument
     random.seed(0)
     np.random.seed(0)
 
-    train(episodes=8000, alpha=0.1, gamma=0.99)
+    train(episodes=8000, alpha=0.1, gamma=0.99, seed=0)
+    # or, with 32 agents exploring in parallel:
+    # train_batched(episodes=8000, batch_size=32, alpha=0.1, gamma=0.99)
 
     print_policy()
     path = extract_greedy_policy_path()
@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 # ============================================
 # DP / Policy Evaluation for the pictured MDP
 # ============================================
@@ -59,20 +61,26 @@ P = {
     },
 }
 
-def expected_return_for_action(action: str) -> float:
-    """Compute Q(s0, action) = sum_{s',r} p(s',r|s0,a) [ r + gamma V(s') ]."""
-    total = 0.0
-    for (s_next, r), prob in P[action].items():
-        total += prob * (r + gamma * V_fixed[s_next])
-    return total
+# Same table as stacked arrays, one row per action (outcome order as in P):
+# probabilities, rewards and values of the next states
+ACTIONS = ["Left", "Right"]
+P_arr = np.array([list(P[a].values()) for a in ACTIONS])
+R_arr = np.array([[r for (_, r) in P[a]] for a in ACTIONS], dtype=float)
+Vnext_arr = np.array([[V_fixed[s_next] for (s_next, _) in P[a]] for a in ACTIONS])
+pi_arr = np.array([pi[a] for a in ACTIONS])
+
+def action_values() -> np.ndarray:
+    """Q(s0, a) for all actions at once: sum_{s',r} p(s',r|s0,a) [ r + gamma V(s') ]."""
+    return (P_arr * (R_arr + gamma * Vnext_arr)).sum(axis=1)
 
-def bellman_update(V_s0: float) -> float:
+def bellman_update(V_s0: float, Q: np.ndarray = None) -> float:
     """One Bellman expectation update for V(s0) under the fixed policy pi."""
     # V_s0 isn't actually used in this particular MDP structure (no transitions back to s0),
     # but we keep it in the signature to emphasize it's an iterative DP update.
-    q_left = expected_return_for_action("Left")
-    q_right = expected_return_for_action("Right")
-    return pi["Left"] * q_left + pi["Right"] * q_right
+    # Pass precomputed action-values Q to skip recomputing them.
+    if Q is None:
+        Q = action_values()
+    return float(pi_arr @ Q)
 
 def main():
     tol = 1e-12
@@ -82,8 +90,8 @@ def main():
     V_s0 = 0.0
 
     # Precompute action-values (these are constants here)
-    q_left = expected_return_for_action("Left")
-    q_right = expected_return_for_action("Right")
+    Q = action_values()
+    q_left, q_right = Q
 
     print("Given:")
     print(f"  gamma = {gamma}")
@@ -103,11 +111,12 @@ def main():
     print("-" * 52)
 
     for it in range(1, max_iter + 1):
-        V_new = bellman_update(V_s0)
+        V_new = bellman_update(V_s0, Q)
         delta = abs(V_new - V_s0)
         print(f"{it:4d} | {V_s0:12.8f} -> {V_new:12.8f} | {delta:.3e}")
+        converged = math.isclose(V_new, V_s0, rel_tol=0.0, abs_tol=tol)
         V_s0 = V_new
-        if delta < tol:
+        if converged:
             break
 
     print("\nFinal:")
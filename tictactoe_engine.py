@@ -0,0 +1,518 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import cache
+from itertools import repeat
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional: the Bellman kernels then run as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+# =========================
+# Tic-Tac-Toe as an MDP, shared by TictacToe_valueIteration.py and
+# tictactoe_policyIteration.py: boards and symmetries, the opponent, state
+# enumeration, the flat transition table, the Bellman sweep and evaluation.
+# Agent = 'X'
+# Opponent = 'O' with a fixed stochastic policy (default: random legal move)
+# =========================
+
+WIN_LINES = [
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # cols
+    (0, 4, 8), (2, 4, 6)              # diags
+]
+
+# Boards are bitboards: board = (x_mask << 9) | o_mask, bit i of a mask = cell i.
+X_SHIFT = 9
+FULL = 0x1FF
+EMPTY_BOARD = 0
+WIN_MASKS = [(1 << a) | (1 << b) | (1 << c) for a, b, c in WIN_LINES]
+
+
+# D4 symmetries (4 rotations x optional mirror): PERMS[k][i] is the cell that lands
+# on cell i under transform k, and PERM_MASK[k][m] applies it to a 9-bit mask.
+def _d4_perms():
+    rotate = lambda p: [p[3 * (2 - c) + r] for r in range(3) for c in range(3)]
+    mirror = lambda p: [p[3 * r + 2 - c] for r in range(3) for c in range(3)]
+    perms = []
+    for p in (list(range(9)), mirror(list(range(9)))):
+        for _ in range(4):
+            perms.append(p)
+            p = rotate(p)
+    return perms
+
+
+PERMS = _d4_perms()
+PERM_MASK = [[sum((m >> p[i] & 1) << i for i in range(9)) for m in range(512)] for p in PERMS]
+
+# Array copies for the vectorized opponent expansion and evaluate()
+PERM_MASK_ARR = np.array(PERM_MASK)
+PERMS_ARR = np.array(PERMS)
+CELL_BITS = 1 << np.arange(9)
+# Set cells of each 9-bit mask: the legal moves for every free-cell mask
+LEGAL_BY_MASK = [tuple(i for i in range(9) if m >> i & 1) for m in range(512)]
+
+# Rewards from X's perspective
+R_WIN = 1.0
+R_LOSE = -1.0
+R_DRAW = 0.0
+R_STEP = 0.0  # optional step shaping, e.g. -0.01 to prefer faster wins
+
+GAMMA = 1.0   # episodic, undiscounted
+TIE_TOL = 1e-6  # Q values this close to the best count as ties (first move wins);
+                # well above the rounding of the float32 transition probabilities
+
+
+# Game outcomes tabulated once for all 3^9 boards. A board's base-3 id has digit
+# 0 ('.'), 1 (X) or 2 (O) for cell i, i.e. TRITS[x_mask] + 2 * TRITS[o_mask].
+# WINNER codes index WINNER_NAMES; REWARD is the terminal reward (R_DRAW if ongoing).
+TRITS = np.array([sum(3 ** i for i in range(9) if m >> i & 1) for m in range(512)])
+WINNER_NAMES = [None, "X", "O", "D"]
+
+
+def _winner_code(x, o):
+    """Reference scan of the win lines: 1 = X won, 2 = O won, 3 = draw, 0 = ongoing."""
+    for m in WIN_MASKS:
+        if x & m == m:
+            return 1
+        if o & m == m:
+            return 2
+    return 3 if x | o == FULL else 0
+
+
+def _outcome_tables():
+    winner = np.zeros(3 ** 9, dtype=np.int8)
+    for x in range(512):
+        free = ~x & FULL
+        o = free
+        while True:  # every o_mask disjoint from x
+            winner[TRITS[x] + 2 * TRITS[o]] = _winner_code(x, o)
+            if o == 0:
+                break
+            o = (o - 1) & free
+    reward = np.select([winner == 1, winner == 2], [R_WIN, R_LOSE], R_DRAW)
+    return winner, winner != 0, reward
+
+
+WINNER, TERMINAL, REWARD = _outcome_tables()
+# list copies for fast scalar lookups
+_TRITS, _WINNER, _TERMINAL, _REWARD = TRITS.tolist(), WINNER.tolist(), TERMINAL.tolist(), REWARD.tolist()
+
+
+def board_id(board: int) -> int:
+    return _TRITS[board >> X_SHIFT] + 2 * _TRITS[board & FULL]
+
+
+def check_winner(board: int):
+    """Return 'X', 'O', 'D' (draw), or None (game ongoing)."""
+    return WINNER_NAMES[_WINNER[board_id(board)]]
+
+
+def is_terminal(board: int) -> bool:
+    return _TERMINAL[board_id(board)]
+
+
+def terminal_reward(board: int) -> float:
+    return _REWARD[board_id(board)]
+
+
+def legal_moves(board: int):
+    return LEGAL_BY_MASK[~((board >> X_SHIFT) | board) & FULL]
+
+
+def apply_move(board: int, idx: int, player: str) -> int:
+    return board | (1 << (idx + X_SHIFT if player == "X" else idx))
+
+
+def x_to_move(board: int) -> bool:
+    return bin(board >> X_SHIFT).count("1") == bin(board & FULL).count("1")
+
+
+def canonicalize(board: int) -> tuple:
+    """
+    (canonical board, k): the smallest of the 8 symmetric images of board, and the
+    transform that produced it. Cell i of the canonical board is cell PERMS[k][i] of board.
+    """
+    x, o = board >> X_SHIFT, board & FULL
+    return min(((pm[x] << X_SHIFT) | pm[o], k) for k, pm in enumerate(PERM_MASK))
+
+
+# -------------------------
+# Opponent policy (O) - fixed, stochastic
+# -------------------------
+def opponent_policy_random(board: int):
+    """Uniform random over legal moves."""
+    moves = legal_moves(board)
+    p = 1.0 / len(moves)
+    return [(m, p) for m in moves]
+
+
+# Slightly different but still fixed opponent (optional)
+def opponent_policy_center_then_random(board: int):
+    moves = legal_moves(board)
+    if 4 in moves:
+        rest = [m for m in moves if m != 4]
+        if not rest:
+            return [(4, 1.0)]
+        probs = [(4, 0.6)]
+        p = 0.4 / len(rest)
+        probs += [(m, p) for m in rest]
+        return probs
+    p = 1.0 / len(moves)
+    return [(m, p) for m in moves]
+
+
+OPP_POLICY = opponent_policy_random  # <--- swap here, or set tictactoe_engine.OPP_POLICY
+# (the solver stores one board per symmetry class, so the policy must treat
+# rotated/mirrored boards alike; both policies above do)
+
+
+def build_alias(probs: list) -> tuple:
+    """
+    Walker's alias tables (prob, alias) for probs: draw i uniformly, keep it with
+    probability prob[i], else take alias[i]: O(1) per sample, whatever len(probs).
+    """
+    k = len(probs)
+    scaled = [p * k for p in probs]
+    prob, alias = [1.0] * k, list(range(k))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        i, j = small.pop(), large.pop()
+        prob[i], alias[i] = scaled[i], j
+        scaled[j] -= 1.0 - scaled[i]
+        (small if scaled[j] < 1.0 else large).append(j)
+    return prob, alias
+
+
+@cache
+def _opp_alias(policy, board: int):
+    moves, probs = zip(*policy(board))
+    return (moves, *build_alias(probs))
+
+
+def opp_alias(board: int):
+    """O's moves on board and their alias tables, for sampling in play_game / evaluate."""
+    # cached per (policy, board), so swapping OPP_POLICY never serves stale tables
+    return _opp_alias(OPP_POLICY, board)
+
+
+# -------------------------
+# MDP transitions: X acts, then O acts stochastically
+# -------------------------
+def transitions_after_x(board: int, x_move: int):
+    """
+    Given board and X's move, return list of (next_board, prob, reward, done).
+    Called once per (state, move) by reachable_x_states; use get_transitions after that.
+    """
+    if is_terminal(board):
+        return [(board, 1.0, terminal_reward(board), True)]
+
+    b1 = apply_move(board, x_move, "X")
+
+    if is_terminal(b1):
+        return [(b1, 1.0, terminal_reward(b1), True)]
+
+    # All O replies at once, one array entry per O move. Successors are canonical,
+    # and replies reaching symmetric boards are merged.
+    dist = OPP_POLICY(b1)
+    x = b1 >> X_SHIFT
+    o = (b1 & FULL) | (1 << np.array([m for m, _ in dist]))
+    ids = TRITS[x] + 2 * TRITS[o]
+    done = TERMINAL[ids]
+    r = np.where(done, REWARD[ids], np.float64(R_STEP))
+
+    canon = ((PERM_MASK_ARR[:, x, None] << X_SHIFT) | PERM_MASK_ARR[:, o]).min(axis=0)
+    b2, first, inv = np.unique(canon, return_index=True, return_inverse=True)
+    probs = np.bincount(inv, weights=[p for _, p in dist])
+    return list(zip(b2.tolist(), probs.tolist(), r[first].tolist(), done[first].tolist()))
+
+
+# Filled by reachable_x_states: the X-to-move states (a state's id, sid, is its
+# position in STATES), board -> sid, the (lo, hi) sid range of each ply layer,
+# each state's legal moves, and the transitions keyed by sid * 9 + move.
+# V and pi are dense arrays indexed by sid.
+STATES = []
+STATE_ID = {}
+LAYERS = []
+LEGAL = []
+TRANS = {}
+
+
+def get_transitions(sid: int, a: int) -> list:
+    return TRANS[sid * 9 + a]
+
+
+# -------------------------
+# Enumerate states where it's X to move (reachable)
+# -------------------------
+def reachable_x_states():
+    """
+    Generate all reachable boards where it is X to move (X count == O count),
+    under the assumption both players can pick any legal move.
+    Returns them as a list ordered by ply, deepest first (a state's id is its
+    position), fills LAYERS with each ply's id range, and fills TRANS for every
+    (state, move).
+    """
+    # Breadth first by ply: layers[k] holds the canonical boards after k X and k O
+    # moves, so each board lands in exactly one layer and is hashed once per arrival
+    layers = [{EMPTY_BOARD}]
+    while layers[-1]:
+        nxt = set()
+        for b in layers[-1]:
+            # Expand: X moves then O moves (any legal), to another X-to-move board
+            for xm in legal_moves(b):
+                b1 = apply_move(b, xm, "X")
+                if is_terminal(b1):
+                    continue
+                for om in legal_moves(b1):
+                    b2 = apply_move(b1, om, "O")
+                    if not is_terminal(b2):
+                        nxt.add(canonicalize(b2)[0])
+        layers.append(nxt)
+
+    # Deepest layer first; sorted within a layer so ids do not depend on set order
+    states = []
+    LAYERS.clear()
+    for layer in reversed(layers[:-1]):
+        LAYERS.append((len(states), len(states) + len(layer)))
+        states += sorted(layer)
+    STATES[:] = states
+    STATE_ID.clear()
+    STATE_ID.update((b, sid) for sid, b in enumerate(states))
+    LEGAL[:] = [legal_moves(b) for b in states]
+    TRANS.clear()
+    TRANS.update((sid * 9 + a, transitions_after_x(b, a))
+                 for sid, b in enumerate(states) for a in LEGAL[sid])
+    return states
+
+
+# -------------------------
+# Flat transition table (structure of arrays)
+# -------------------------
+@dataclass
+class TransitionTable:
+    """
+    Every (state, X move) -> next state transition as parallel arrays.
+    States are indices into `states`, ordered by ply, deepest first; layers holds
+    the (lo, hi) index range of each ply. Each (state, move) pair is an "sa" row:
+    the rows of state i are sa_start[i] .. sa_start[i+1]-1, and the transitions
+    of row j are tr_start[j] .. tr_start[j+1]-1.
+    Per transition: packed = (next state index << 3) | (reward code << 1) | done,
+    with the next index 0 (unused) when done and the reward REWARD_VALUES[code]
+    (code = the next board's WINNER code),
+    and its probability (float32).
+    """
+    states: list
+    layers: list
+    sa_start: np.ndarray
+    sa_action: np.ndarray
+    tr_start: np.ndarray
+    packed: np.ndarray
+    prob: np.ndarray
+
+    def sweep_args(self) -> tuple:
+        """This table's bellman_sweep arguments after lo, hi (up to mode)."""
+        return (self.sa_start, self.tr_start, self.packed, self.prob,
+                REWARD_VALUES, GAMMA, TIE_TOL)
+
+
+# Reward per 2-bit transition code: the WINNER code of the next board, so 0
+# (ongoing) is a step and 1-3 are X win / O win / draw
+REWARD_VALUES = np.array([R_STEP, R_WIN, R_LOSE, R_DRAW])
+
+
+def build_table() -> TransitionTable:
+    """
+    Flatten the last reachable_x_states() enumeration into a TransitionTable.
+    Reads its globals (STATES, LAYERS, LEGAL, STATE_ID and TRANS via
+    get_transitions), so call reachable_x_states() first.
+    """
+    states, layers = list(STATES), list(LAYERS)
+
+    sa_start, sa_action, tr_start, packed, prob = [0], [], [0], [], []
+    for sid in range(len(states)):
+        for a in LEGAL[sid]:
+            sa_action.append(a)
+            for s2, p, r, done in get_transitions(sid, a):
+                sid2 = 0 if done else STATE_ID[s2]
+                packed.append(sid2 << 3 | _WINNER[board_id(s2)] << 1 | done)
+                prob.append(p)
+            tr_start.append(len(packed))
+        sa_start.append(len(sa_action))
+    ids = lambda xs: np.array(xs, dtype=np.int32)
+    return TransitionTable(
+        states, layers, ids(sa_start), ids(sa_action), ids(tr_start),
+        ids(packed), np.array(prob, dtype=np.float32),
+    )
+
+
+# Bellman sweep modes: evaluate the fixed sa row per state, or maximize over rows
+FIXED_PI = 0
+MAXIMIZE = 1
+
+
+@njit(cache=True)
+def bellman_sweep(lo, hi, sa_start, tr_start, packed, prob, reward_values, gamma, tie_tol,
+                  mode, V, V_out, rows):
+    """
+    One backup of states lo..hi-1, reading V and writing V_out (may be V itself),
+    with Q(s, row) = sum_s' p (r + gamma V[s']) over the row's packed transitions:
+    FIXED_PI: V_out[s] = Q(s, rows[s]).
+    MAXIMIZE: V_out[s] = max Q(s, .) and rows[s] = the first sa row within
+    tie_tol of that max.
+    Shared by value and policy iteration. Compiled by numba.
+    """
+    q = np.empty(9)
+    for s in range(lo, hi):
+        if mode == FIXED_PI:
+            a0, a1 = rows[s], rows[s] + 1
+        else:
+            a0, a1 = sa_start[s], sa_start[s + 1]
+        best = -np.inf
+        for j in range(a0, a1):
+            acc = 0.0
+            for t in range(tr_start[j], tr_start[j + 1]):
+                code = packed[t]
+                v = 0.0 if code & 1 else V[code >> 3]
+                acc += prob[t] * (reward_values[code >> 1 & 3] + gamma * v)
+            q[j - a0] = acc
+            if acc > best:
+                best = acc
+        if mode == MAXIMIZE:
+            for j in range(a0, a1):
+                if q[j - a0] >= best - tie_tol:
+                    rows[s] = j
+                    break
+        V_out[s] = best
+
+
+# -------------------------
+# Simulation / evaluation
+# -------------------------
+def play_game(policy, seed=None, verbose=False):
+    if seed is not None:
+        random.seed(seed)
+    b = EMPTY_BOARD
+
+    while True:
+        w = check_winner(b)
+        if w is not None:
+            return 1 if w == "X" else (-1 if w == "O" else 0)
+
+        # X move
+        assert x_to_move(b), "Not X's turn unexpectedly."
+        canon, k = canonicalize(b)
+        sid = STATE_ID.get(canon)
+        if sid is None:
+            xm = random.choice(legal_moves(b))  # fallback
+        else:
+            xm = PERMS[k][policy[sid]]  # back from the canonical board to b
+        b = apply_move(b, xm, "X")
+        if verbose:
+            print("X plays", xm)
+            print(render(b), "\n")
+
+        w = check_winner(b)
+        if w is not None:
+            continue
+
+        # O move
+        if OPP_POLICY is opponent_policy_random:
+            om = random.choice(legal_moves(b))
+        else:
+            moves, prob, alias = opp_alias(b)
+            i = random.randrange(len(moves))
+            om = moves[i] if random.random() < prob[i] else moves[alias[i]]
+        b = apply_move(b, om, "O")
+        if verbose:
+            print("O plays", om)
+            print(render(b), "\n")
+
+
+def _evaluate_shard(states, policy, n, seed):
+    """
+    Play n games against OPP_POLICY at once, as arrays of x/o masks, and return
+    (wins, losses, draws). X plays policy[i] on the canonical board states[i], as
+    in play_game; a board missing from states gets a random legal move.
+    """
+    rng = np.random.default_rng(seed)
+    keys = np.array(states + [-1])  # -1: matches no board
+    moves = np.append(np.asarray(policy, dtype=np.int64), 0)
+    order = keys.argsort()
+    keys, moves = keys[order], moves[order]
+    x = np.zeros(n, dtype=np.int64)
+    o = np.zeros(n, dtype=np.int64)
+    winner = np.zeros(n, dtype=np.int8)  # WINNER code per game, 0 while ongoing
+    active = np.arange(n)
+
+    def random_free(xa, oa):
+        free = (~(xa | oa)[:, None] & CELL_BITS) != 0
+        return np.where(free, rng.random(free.shape), -1.0).argmax(axis=1)
+
+    def finish(xa, oa):
+        nonlocal active
+        code = WINNER[TRITS[xa] + 2 * TRITS[oa]]
+        winner[active] = code
+        active = active[code == 0]
+
+    while active.size:
+        # X move: canonicalize every board, look up the move, map it back
+        xa, oa = x[active], o[active]
+        images = (PERM_MASK_ARR[:, xa] << X_SHIFT) | PERM_MASK_ARR[:, oa]
+        k = images.argmin(axis=0)
+        canon = images[k, np.arange(active.size)]
+        pos = np.searchsorted(keys, canon).clip(max=len(keys) - 1)
+        xm = np.where(keys[pos] == canon, PERMS_ARR[k, moves[pos]], random_free(xa, oa))
+        x[active] = xa = xa | (1 << xm)
+        finish(xa, oa)
+        if not active.size:
+            break
+
+        # O move: uniform over free cells, or per distinct board from its alias tables
+        xa, oa = x[active], o[active]
+        if OPP_POLICY is opponent_policy_random:
+            om = random_free(xa, oa)
+        else:
+            om = np.empty(active.size, dtype=np.int64)
+            u, v = rng.random((2, active.size))
+            boards, inv = np.unique((xa << X_SHIFT) | oa, return_inverse=True)
+            for j, b in enumerate(boards.tolist()):
+                sel = inv == j
+                opts, prob, alias = map(np.array, opp_alias(b))
+                i = (u[sel] * len(opts)).astype(np.int64)
+                om[sel] = np.where(v[sel] < prob[i], opts[i], opts[alias[i]])
+        o[active] = oa = oa | (1 << om)
+        finish(xa, oa)
+
+    return int((winner == 1).sum()), int((winner == 2).sum()), int((winner == 3).sum())
+
+
+def evaluate(policy, n=20000, seed=0, workers=1):
+    """
+    (wins, losses, draws) over n games against OPP_POLICY. With workers > 1
+    (None = all CPUs) the games are split into shards seeded seed, seed+1, ...
+    and played in separate processes; each shard is already vectorized, so this
+    only pays off for very large n.
+    """
+    workers = workers or os.cpu_count()
+    if workers <= 1:
+        return _evaluate_shard(STATES, policy, n, seed)
+    sizes = [n // workers + (i < n % workers) for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        shards = ex.map(_evaluate_shard, repeat(STATES), repeat(policy), sizes,
+                        range(seed, seed + workers))
+        return tuple(map(sum, zip(*shards)))
+
+
+def render(board: int) -> str:
+    x, o = board >> X_SHIFT, board & FULL
+    cells = ["X" if x >> i & 1 else ("O" if o >> i & 1 else ".") for i in range(9)]
+    return "\n".join(" ".join(cells[i:i+3]) for i in range(0, 9, 3))